@@ -1,9 +1,11 @@
+import aiohttp
+import asyncio
 import discord
+import orjson
 import os
-import requests
-import json
-from discord.commands import SlashCommandGroup
+import time
 from dotenv import load_dotenv
+from types import MappingProxyType
 
 # Load environment variables. Create a .env file in the same directory:
 # DISCORD_TOKEN=your_discord_bot_token
@@ -13,58 +15,494 @@ from dotenv import load_dotenv
 # or set them in your deployment environment.
 load_dotenv()
 
-DISCORD_TOKEN = os.environ.get('DISCORD_TOKEN')
-GITHUB_TOKEN = os.environ.get('GITHUB_TOKEN')
-GITHUB_REPO = os.environ.get('GITHUB_REPO') # e.g., "octocat/Spoon-Knife"
+# Read every setting once up front; GITHUB_REPO is e.g. "octocat/Spoon-Knife"
+_ENV = MappingProxyType({
+    name: os.environ.get(name)
+    for name in ('DISCORD_TOKEN', 'GITHUB_TOKEN', 'GITHUB_REPO')
+})
 
-if not all([DISCORD_TOKEN, GITHUB_TOKEN, GITHUB_REPO]):
-    print("Error: Missing one or more environment variables.")
+_missing = [name for name, value in _ENV.items() if not value]
+if _missing:
+    print(f"Error: Missing environment variables: {', '.join(_missing)}")
     print("Please set DISCORD_TOKEN, GITHUB_TOKEN, and GITHUB_REPO.")
     exit(1)
 
+DISCORD_TOKEN, GITHUB_TOKEN, GITHUB_REPO = _ENV.values()
+
+# These never change at runtime, so build them once instead of per request
+_ISSUE_URL = f"https://api.github.com/repos/{GITHUB_REPO}/issues"
+_ISSUE_HTML_URL = f"https://github.com/{GITHUB_REPO}/issues"
+_HEADERS = {
+    "Authorization": f"token {GITHUB_TOKEN}",
+    "Accept": "application/vnd.github.v3+json",
+    "Content-Type": "application/json",
+}
+
+# Recently submitted issues, so a double-click on the modal's submit button
+# doesn't open the same issue twice. Maps (title, body, label) to
+# (expiry time, task running the POST); concurrent duplicates share the task.
+_RECENT_ISSUES = {}
+_RECENT_ISSUES_TTL = 60 # seconds
+_RECENT_ISSUES_MAX = 256
+
+# Caps how many create-issue requests are in flight at once, so a burst of
+# reports doesn't trip GitHub's secondary (abuse) rate limits
+_GITHUB_CONCURRENCY = 4
+_GITHUB_SEM = asyncio.Semaphore(_GITHUB_CONCURRENCY)
+# When fewer requests than this remain in the rate limit window, hold later
+# requests until the window resets (time.time() stored in _github_resume_at)
+_RATE_LIMIT_FLOOR = 10
+_github_resume_at = 0
+
+# Issues waiting for a free _GITHUB_SEM slot, as (title, body, label, future).
+# Whatever piles up while every slot is busy is sent as one GraphQL request,
+# so a burst of reports costs one round-trip instead of one each.
+_PENDING_ISSUES = []
+_BATCH_MAX = 10
+_FLUSH_TASKS = set() # keeps the running flush tasks from being garbage collected
+_GRAPHQL_URL = "https://api.github.com/graphql"
+# (repository node ID, {label name: label node ID}), looked up on first batch
+# and again whenever a batch needs a label that isn't in it yet or GitHub
+# rejects a cached ID, but at most once per _REPO_NODE_IDS_RETRY seconds so a
+# missing label or failed lookup doesn't cost every batch an extra round-trip
+_repo_node_ids = None
+_repo_node_ids_fetched_at = float("-inf")
+_REPO_NODE_IDS_RETRY = 60 # seconds
+_REPO_NODE_IDS_LOCK = asyncio.Lock()
+
 # --- GitHub API Function ---
-def create_github_issue(title, body, label):
+async def create_github_issue(title, body, label):
     """
     Creates a new issue on the configured GitHub repository.
+
+    Identical reports submitted within _RECENT_ISSUES_TTL seconds return
+    the URL of the first one instead of creating a duplicate.
+    """
+    key = (title, body, label)
+    now = time.monotonic()
+
+    cached = _RECENT_ISSUES.get(key)
+    if cached is not None and cached[0] > now:
+        return await cached[1]
+
+    # Drop expired entries, then the oldest ones if we're still over the limit
+    for k in [k for k, (expiry, _) in _RECENT_ISSUES.items() if expiry <= now]:
+        del _RECENT_ISSUES[k]
+    while len(_RECENT_ISSUES) >= _RECENT_ISSUES_MAX:
+        del _RECENT_ISSUES[next(iter(_RECENT_ISSUES))]
+
+    task = asyncio.ensure_future(_post_github_issue(title, body, label))
+    _RECENT_ISSUES[key] = (now + _RECENT_ISSUES_TTL, task)
+
+    issue_url = await task
+    if issue_url is None and _RECENT_ISSUES.get(key, (None, None))[1] is task:
+        # Don't remember failures, so the user can retry straight away
+        del _RECENT_ISSUES[key]
+    return issue_url
+
+
+async def _post_github_issue(title, body, label):
+    """
+    Hands one issue to the next GitHub request and returns its URL, or None
+    if it couldn't be created.
+    """
+    future = asyncio.get_running_loop().create_future()
+    _PENDING_ISSUES.append((title, body, label, future))
+    if len(_PENDING_ISSUES) == 1:
+        # Nothing is waiting to send the pending issues yet
+        task = asyncio.create_task(_flush_pending_issues())
+        _FLUSH_TASKS.add(task)
+        task.add_done_callback(_FLUSH_TASKS.discard)
+    return await future
+
+
+async def _flush_pending_issues():
+    """
+    Waits for a free request slot, then creates every issue that piled up
+    in the meantime: one REST call for a single issue, or one batched
+    GraphQL mutation for several. Issues GraphQL can't take are then sent
+    through REST concurrently, each in its own slot.
+    """
+    batch = []
+    try:
+        async with _GITHUB_SEM:
+            await _wait_for_rate_limit()
+
+            batch = _PENDING_ISSUES[:_BATCH_MAX]
+            del _PENDING_ISSUES[:_BATCH_MAX]
+            if _PENDING_ISSUES:
+                # More than one batch's worth arrived; send the rest next
+                task = asyncio.create_task(_flush_pending_issues())
+                _FLUSH_TASKS.add(task)
+                task.add_done_callback(_FLUSH_TASKS.discard)
+
+            if len(batch) == 1:
+                title, body, label, _ = batch[0]
+                results, fallback = [await _rest_create_issue(title, body, label)], []
+            else:
+                results, fallback = await _graphql_create_issues(batch)
+
+        # Answer whoever we can now, rather than after the REST fallbacks
+        for n, issue_url in enumerate(results):
+            if n not in fallback:
+                _resolve_pending(batch[n], issue_url)
+
+        async def send_fallback(item):
+            # Catch per item: letting one failure escape gather would resolve
+            # the others to None while their requests still create issues
+            try:
+                issue_url = await _rest_create_issue_with_slot(*item[:3])
+            except Exception as e:
+                print(f"Error creating GitHub issue: {e!r}")
+                issue_url = None
+            _resolve_pending(item, issue_url)
+
+        # Only cancellation gets out of here, and that cancels the fallbacks
+        # too, so the finally below never answers a request still running
+        await asyncio.gather(*(send_fallback(batch[n]) for n in fallback))
+
+    except Exception as e:
+        # This task is never awaited, so log here or the error is lost
+        print(f"Error creating batched GitHub issues: {e!r}")
+
+    finally:
+        # Always resolve every future, or its reporter would wait forever
+        for item in batch:
+            _resolve_pending(item, None)
+
+
+def _resolve_pending(item, issue_url):
+    """Hands issue_url to the reporter waiting on a _PENDING_ISSUES item."""
+    future = item[3]
+    if not future.done():
+        future.set_result(issue_url)
+
+
+async def _wait_for_rate_limit():
+    """
+    Sleeps until the rate limit window resets if a previous response said
+    it's nearly used up. Call while holding _GITHUB_SEM, so queued requests
+    wait too.
+    """
+    delay = _github_resume_at - time.time()
+    if delay > 0:
+        print(f"GitHub rate limit nearly exhausted, waiting {delay:.0f}s")
+        await asyncio.sleep(delay)
+
+
+async def _rest_create_issue_with_slot(title, body, label):
+    """Like _rest_create_issue, but takes a _GITHUB_SEM slot itself."""
+    async with _GITHUB_SEM:
+        await _wait_for_rate_limit()
+        return await _rest_create_issue(title, body, label)
+
+
+async def _rest_create_issue(title, body, label):
+    """
+    Creates one issue through the REST API and returns its URL, or None if
+    the request failed. The caller must hold _GITHUB_SEM.
     """
-    url = f"https://api.github.com/repos/{GITHUB_REPO}/issues"
-    
-    headers = {
-        "Authorization": f"token {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github.v3+json",
-    }
-    
     payload = {
         "title": title,
         "body": body,
         "labels": [label]
     }
-    
+
+    result = await _github_post(_ISSUE_URL, payload)
+    if result is None:
+        return None
+    headers, content = result
+
+    # The issue's API URL in Location ends with its number, which is all we
+    # need to build the link without decoding the full issue object
+    location = headers.get("Location")
+    if location:
+        return f"{_ISSUE_HTML_URL}/{location.rsplit('/', 1)[-1]}"
+
     try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
-        response.raise_for_status() # Raise an exception for bad status codes
-        
         # Return the URL of the newly created issue
-        return response.json().get("html_url")
-        
-    except requests.exceptions.RequestException as e:
+        return orjson.loads(content).get("html_url")
+    except orjson.JSONDecodeError as e:
         print(f"Error creating GitHub issue: {e}")
-        if response.content:
-            print(f"Response content: {response.content}")
         return None
 
+
+async def _graphql_create_issues(batch):
+    """
+    Creates several issues with a single GraphQL request, one aliased
+    createIssue mutation per issue. Returns (urls, fallback): the URLs in
+    batch order (None for any that failed or weren't sent), and the batch
+    indices the caller should send through REST instead: those whose labels
+    have no node ID, and those whose mutation GitHub rejected. The caller
+    must hold _GITHUB_SEM.
+    """
+    node_ids = await _get_repo_node_ids({label for _, _, label, _ in batch})
+    repo_id, label_ids = node_ids if node_ids is not None else (None, {})
+
+    # GraphQL needs label node IDs; REST also accepts labels by name, and
+    # creates the label if it doesn't exist yet
+    resolved = [n for n, (_, _, label, _) in enumerate(batch) if label in label_ids]
+    fallback = [n for n in range(len(batch)) if n not in resolved]
+    urls = [None] * len(batch)
+    if not resolved:
+        return urls, fallback
+
+    aliases = [f"i{n}" for n in resolved]
+    query = (
+        "mutation(" + ", ".join(f"${a}: CreateIssueInput!" for a in aliases) + ") { "
+        + " ".join(f"{a}: createIssue(input: ${a}) {{ issue {{ url }} }}" for a in aliases)
+        + " }"
+    )
+    variables = {}
+    for alias, n in zip(aliases, resolved):
+        title, body, label, _ = batch[n]
+        variables[alias] = {
+            "repositoryId": repo_id,
+            "title": title,
+            "body": body,
+            "labelIds": [label_ids[label]],
+        }
+
+    data = await _graphql(query, variables)
+    if data is None:
+        # The request itself failed, so we can't tell whether any issue was
+        # created; retrying could open duplicates
+        return urls, fallback
+
+    # A rejected mutation leaves its alias null while the others still
+    # succeed, and creates nothing, so it's safe to retry through REST
+    rejected = []
+    for alias, n in zip(aliases, resolved):
+        entry = data.get(alias) if isinstance(data, dict) else None
+        issue = entry.get("issue") if isinstance(entry, dict) else None
+        urls[n] = issue.get("url") if isinstance(issue, dict) else None
+        if urls[n] is None:
+            rejected.append(n)
+
+    if rejected:
+        # Most likely a cached node ID went stale, e.g. a label was deleted
+        # and recreated, so look them up afresh next time
+        _forget_repo_node_ids()
+    return urls, sorted(fallback + rejected)
+
+
+async def _get_repo_node_ids(labels):
+    """
+    Returns (repository node ID, {label name: label node ID}) for
+    GITHUB_REPO, or None if they aren't known. Looks them up if any of
+    labels is missing from the cached map, at most once per
+    _REPO_NODE_IDS_RETRY seconds. The caller must hold _GITHUB_SEM.
+    """
+    global _repo_node_ids, _repo_node_ids_fetched_at
+
+    # Concurrent batches share one lookup instead of each making their own
+    async with _REPO_NODE_IDS_LOCK:
+        stale = _repo_node_ids is None or not labels <= _repo_node_ids[1].keys()
+        if stale and time.monotonic() - _repo_node_ids_fetched_at >= _REPO_NODE_IDS_RETRY:
+            _repo_node_ids_fetched_at = time.monotonic()
+
+            # Ask for just the labels we need by name, rather than paging
+            # through every label on the repository
+            names = sorted(labels)
+            aliases = [f"l{n}" for n in range(len(names))]
+            owner, name = GITHUB_REPO.split("/", 1)
+            data = await _graphql(
+                "query($owner: String!, $name: String!"
+                + "".join(f", ${a}: String!" for a in aliases)
+                + ") { repository(owner: $owner, name: $name) { id "
+                + " ".join(f"{a}: label(name: ${a}) {{ id }}" for a in aliases)
+                + " } }",
+                {"owner": owner, "name": name, **dict(zip(aliases, names))},
+            )
+
+            # Parse defensively; an unexpected shape just means no node IDs
+            repo = data.get("repository") if isinstance(data, dict) else None
+            repo = repo if isinstance(repo, dict) else {}
+            if repo.get("id"):
+                label_ids = {}
+                if _repo_node_ids is not None and _repo_node_ids[0] == repo["id"]:
+                    label_ids.update(_repo_node_ids[1])
+                for alias, label in zip(aliases, names):
+                    node = repo.get(alias)
+                    if isinstance(node, dict) and node.get("id"):
+                        label_ids[label] = node["id"]
+                _repo_node_ids = (repo["id"], label_ids)
+
+    return _repo_node_ids
+
+
+def _forget_repo_node_ids():
+    """
+    Drops the cached node IDs so the next batch looks them up again, still
+    subject to _REPO_NODE_IDS_RETRY; until then batches go through REST.
+    """
+    global _repo_node_ids
+    _repo_node_ids = None
+
+
+async def _graphql(query, variables):
+    """
+    Runs a GraphQL query and returns its "data" object, or None if the
+    request failed outright. A response that only carries errors returns
+    an empty dict. The caller must hold _GITHUB_SEM.
+    """
+    result = await _github_post(_GRAPHQL_URL, {"query": query, "variables": variables})
+    if result is None:
+        return None
+
+    try:
+        response = orjson.loads(result[1])
+    except orjson.JSONDecodeError as e:
+        print(f"Error decoding GitHub GraphQL response: {e}")
+        return None
+    if not isinstance(response, dict):
+        print(f"Unexpected GitHub GraphQL response: {response!r:.1024}")
+        return None
+
+    if response.get("errors"):
+        # GraphQL reports errors with a 200 status, possibly alongside data
+        print(f"GitHub GraphQL errors: {response['errors']}")
+    return response.get("data") or {}
+
+
+async def _github_post(url, payload):
+    """
+    POSTs payload to the GitHub API and returns (response headers, body),
+    or None if the request failed. The caller must hold _GITHUB_SEM.
+    """
+    global _github_resume_at
+
+    try:
+        async with bot.http_session.post(url, data=orjson.dumps(payload)) as response:
+            _github_resume_at = max(_github_resume_at, _rate_limit_reset(response.headers))
+            if not response.ok:
+                # Only log the start of the body; outage pages can be huge
+                print(f"Response content: {await response.content.read(1024)!r}")
+            response.raise_for_status() # Raise an exception for bad status codes
+
+            # Read the body even when it isn't needed, or the connection
+            # can't go back to the pool for reuse
+            return response.headers, await response.read()
+
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        # Timeouts aren't ClientErrors, so they need catching separately
+        print(f"Error creating GitHub issue: {e!r}")
+        return None
+
+
+def _rate_limit_reset(headers):
+    """
+    Returns the time (as time.time()) at which GitHub requests may resume,
+    based on the X-RateLimit-* response headers, or 0 if there's no need
+    to wait.
+    """
+    try:
+        remaining = int(headers["X-RateLimit-Remaining"])
+        reset = int(headers["X-RateLimit-Reset"])
+    except (KeyError, ValueError):
+        return 0
+
+    if remaining >= _RATE_LIMIT_FLOOR:
+        return 0
+    return reset
+
+# --- Issue Queue ---
+# Submitted reports wait here so the modal can acknowledge the user right
+# away; a few background workers post them to GitHub and send the result.
+# Items are (interaction, github_title, github_body, issue_type, title).
+_ISSUE_QUEUE = asyncio.Queue()
+# Enough workers to keep every GitHub request slot busy with a full batch
+# waiting behind them; fewer and reports could never pile up into a batch
+_ISSUE_WORKERS = _GITHUB_CONCURRENCY + _BATCH_MAX
+
+async def _issue_worker():
+    """Posts queued reports to GitHub until cancelled."""
+    while True:
+        interaction, github_title, github_body, issue_type, title = await _ISSUE_QUEUE.get()
+        try:
+            issue_url = await create_github_issue(github_title, github_body, issue_type)
+            await _send_issue_result(interaction, issue_type, title, issue_url)
+        except Exception as e:
+            # Keep the worker alive if Discord rejects the followup
+            print(f"Error handling queued report: {e}")
+        finally:
+            _ISSUE_QUEUE.task_done()
+
+
+# Embed title and color for each report type's confirmation message
+_TITLE_BY_TYPE = {"bug": "Bug Report Created", "suggestion": "Suggestion Report Created"}
+_COLOR_BY_TYPE = {"bug": discord.Color.red(), "suggestion": discord.Color.green()}
+
+async def _send_issue_result(interaction, issue_type, title, issue_url):
+    """Tells the reporter whether their GitHub issue was created."""
+    if issue_url:
+        embed = discord.Embed(
+            title=_TITLE_BY_TYPE[issue_type],
+            description=f"✅ Thanks, {interaction.user.mention}! Your {issue_type} report has been successfully created.",
+            color=_COLOR_BY_TYPE[issue_type]
+        )
+        embed.add_field(name="Issue URL", value=f"[View on GitHub]({issue_url})", inline=False)
+        embed.add_field(name="Title", value=title, inline=False)
+        await interaction.followup.send(embed=embed)
+    else:
+        await interaction.followup.send(f"❌ Sorry, {interaction.user.mention}. There was an error creating the GitHub issue.")
+
 # --- Discord Bot Setup ---
 # Define the intents your bot needs.
 intents = discord.Intents.default()
-intents.message_content = True # Required to read message content
-intents.messages = True
+# Reports only arrive as interactions, so skip message events entirely
+# rather than having the gateway send (and the library parse and cache)
+# every message in every channel the bot can see
+intents.messages = False
+
+class IssueBot(discord.Bot):
+    """
+    discord.Bot that owns a shared aiohttp session for GitHub API calls and
+    the workers that drain the issue queue.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Created in on_ready, since a ClientSession and tasks both need a
+        # running event loop
+        self.http_session = None
+        self.issue_workers = []
+
+    async def close(self):
+        for worker in self.issue_workers:
+            worker.cancel()
+        self.issue_workers = []
+        # Stop any in-flight GitHub requests (and their REST fallbacks) and
+        # let them unwind before the session they post through goes away
+        flush_tasks = list(_FLUSH_TASKS)
+        for task in flush_tasks:
+            task.cancel()
+        await asyncio.gather(*flush_tasks, return_exceptions=True)
+        if self.http_session is not None:
+            await self.http_session.close()
+            self.http_session = None
+        await super().close()
+
 
 # Use commands.Bot for easier command handling
-bot = discord.Bot(intents=intents)
+bot = IssueBot(intents=intents)
 
 @bot.event
 async def on_ready():
     """Event handler for when the bot has connected to Discord."""
+    # on_ready fires again after reconnects, so only create the session once
+    if bot.http_session is None:
+        # Keep-alive connections and cached DNS let later reports reuse the
+        # TLS connection to api.github.com instead of handshaking each time
+        bot.http_session = aiohttp.ClientSession(
+            headers=_HEADERS,
+            connector=aiohttp.TCPConnector(limit=10, ttl_dns_cache=300),
+            # Well under aiohttp's 300s default, so a stalled GitHub call
+            # fails while the reporter is still waiting on the followup
+            timeout=aiohttp.ClientTimeout(total=30),
+        )
+    if not bot.issue_workers:
+        bot.issue_workers = [asyncio.create_task(_issue_worker()) for _ in range(_ISSUE_WORKERS)]
     print(f"Logged in as {bot.user}")
 
 
@@ -104,6 +542,15 @@ async def issue(ctx: discord.ApplicationContext):
     )
 
 
+# Body of the GitHub issue created from a report
+_BODY_TEMPLATE = (
+    "**{kind} Report from Discord**\n\n"
+    "**Reported by:** {user} (ID: {user_id})\n\n"
+    "**Title:** {title}\n"
+    "**Description:**\n{description}"
+)
+
+
 class ReportModal(discord.ui.Modal):
     def __init__(self, issue_type: str) -> None:
         self.issue_type = issue_type
@@ -131,28 +578,19 @@ class ReportModal(discord.ui.Modal):
 
         # Create a descriptive title and body for the GitHub issue
         github_title = f"{self.issue_type.capitalize()}: {title}"
-        github_body = (
-            f"**{self.issue_type.capitalize()} Report from Discord**\n\n"
-            f"**Reported by:** {interaction.user.name} (ID: {interaction.user.id})\n\n"
-            f"**Title:** {title}\n"
-            f"**Description:**\n{description}"
-        )
-
-        await interaction.response.send_message("Submitting to GitHub...", ephemeral=True)
+        github_body = _BODY_TEMPLATE.format_map({
+            "kind": self.issue_type.capitalize(),
+            "user": interaction.user.name,
+            "user_id": interaction.user.id,
+            "title": title,
+            "description": description,
+        })
 
-        issue_url = create_github_issue(github_title, github_body, self.issue_type)
+        # Acknowledge right away; a queue worker posts to GitHub and sends the
+        # result as a followup, which Discord allows for 15 minutes
+        await interaction.response.defer(ephemeral=True, invisible=False)
 
-        if issue_url:
-            embed = discord.Embed(
-                title=f"{self.issue_type.capitalize()} Report Created",
-                description=f"✅ Thanks, {interaction.user.mention}! Your {self.issue_type} report has been successfully created.",
-                color=discord.Color.green() if self.issue_type == "suggestion" else discord.Color.red()
-            )
-            embed.add_field(name="Issue URL", value=f"[View on GitHub]({issue_url})", inline=False)
-            embed.add_field(name="Title", value=title, inline=False)
-            await interaction.followup.send(embed=embed)
-        else:
-            await interaction.followup.send(f"❌ Sorry, {interaction.user.mention}. There was an error creating the GitHub issue.")
+        _ISSUE_QUEUE.put_nowait((interaction, github_title, github_body, self.issue_type, title))
 
 # --- Run the Bot ---
 if __name__ == "__main__":